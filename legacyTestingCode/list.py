@@ -1,15 +1,21 @@
-import json
+import functools
+import getpass
 import hashlib
-import hmac
-import datetime
+import json
+import math
 import os
-from urllib.parse import quote
-import requests
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
 from dotenv import load_dotenv
 import os
 
+from sigv4 import SigV4Client
+
 load_dotenv()
 BYTEPLUS_VIKINGDB_AK = os.getenv("AK")
 BYTEPLUS_VIKINGDB_SK = os.getenv("SK")
@@ -22,127 +28,151 @@ REGION = "ap-southeast-1"
 SERVICE = "vikingdb"
 VERSION = "2025-06-09"
 
+# One signed transport for the process: its keep-alive Session lets
+# paginated calls reuse the same TCP+TLS connection, and k_signing is
+# derived once per UTC day.
+_CLIENT = SigV4Client(
+    HOST, BYTEPLUS_VIKINGDB_AK or "", BYTEPLUS_VIKINGDB_SK or "", REGION, SERVICE, VERSION
+)
 
-def sha256_hex(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+# Shared encoder for the indent=2 dumps of API responses
+_pretty = json.JSONEncoder(indent=2, ensure_ascii=False).encode
 
+_SEP = "-" * 60
 
-def hmac_sha256(key: bytes, msg: str) -> bytes:
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+# Pages 2..N are fetched concurrently once page 1 has told us TotalCount
+_PAGE_WORKERS = 8
 
 
-def norm_query(params: dict) -> str:
-    return "&".join(
-        f"{quote(str(k), safe='-_.~')}={quote(str(v), safe='-_.~')}"
-        for k, v in sorted(params.items())
-    )
+# List results are cached on disk between runs; pass force=True to refetch.
+# Per-user directory, created 0700, so other local users can't read the
+# listings or plant entries.
+_CACHE_DIR = os.path.join(tempfile.gettempdir(), f"vikingdb_cache_{getpass.getuser()}")
+_CACHE_TTL = 300  # seconds
 
 
 def call_api(action: str, body: dict):
-    method = "POST"
-    uri = "/"
+    return _CLIENT.call(action, body)
 
-    now = datetime.datetime.now(datetime.timezone.utc)
-    x_date = now.strftime("%Y%m%dT%H%M%SZ")
-    short_date = x_date[:8]
+def _disk_cached(fn):
+    """
+    Cache fn's JSON-able result in _CACHE_DIR for _CACHE_TTL seconds,
+    keyed by (host, AK, function, arguments). force=True skips the lookup
+    and refreshes the entry.
 
-    # Action + Version go in QUERY
-    query = {
-        "Action": action,
-        "Version": VERSION,
-    }
+    fn returns (result, complete); only complete results are written, so a
+    listing cut short by an API error is returned but never served later.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, force: bool = False, **kwargs):
+        key = repr((HOST, BYTEPLUS_VIKINGDB_AK, fn.__name__, args, sorted(kwargs.items())))
+        path = os.path.join(_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+        if not force:
+            try:
+                if time.time() - os.path.getmtime(path) < _CACHE_TTL:
+                    with open(path, encoding="utf-8") as f:
+                        return json.load(f)
+            except (OSError, ValueError):
+                pass  # missing / unreadable cache entry -> refetch
+
+        result, complete = fn(*args, **kwargs)
+        if not complete:
+            return result
+
+        # the cache is only an optimisation: a failed write still returns the listing
+        try:
+            os.makedirs(_CACHE_DIR, mode=0o700, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        return result
 
-    # ✅ BODY MUST BE VALID JSON
-    body_str = json.dumps(body, separators=(",", ":"))
-    body_hash = sha256_hex(body_str)
-
-    canonical_headers = (
-        "content-type:application/json\n"
-        f"host:{HOST}\n"
-        f"x-content-sha256:{body_hash}\n"
-        f"x-date:{x_date}\n"
-    )
-
-    signed_headers = "content-type;host;x-content-sha256;x-date"
-
-    canonical_request = "\n".join([
-        method,
-        uri,
-        norm_query(query),
-        canonical_headers,
-        signed_headers,
-        body_hash,
-    ])
-
-    credential_scope = f"{short_date}/{REGION}/{SERVICE}/request"
-    string_to_sign = "\n".join([
-        "HMAC-SHA256",
-        x_date,
-        credential_scope,
-        sha256_hex(canonical_request),
-    ])
-
-    k_date = hmac_sha256(BYTEPLUS_VIKINGDB_SK.encode(), short_date)
-    k_region = hmac_sha256(k_date, REGION)
-    k_service = hmac_sha256(k_region, SERVICE)
-    k_signing = hmac_sha256(k_service, "request")
-    signature = hmac_sha256(k_signing, string_to_sign).hex()
-
-    headers = {
-        "Content-Type": "application/json",
-        "Host": HOST,
-        "X-Date": x_date,
-        "X-Content-Sha256": body_hash,
-        "Authorization": (
-            f"HMAC-SHA256 Credential={BYTEPLUS_VIKINGDB_AK}/{credential_scope}, "
-            f"SignedHeaders={signed_headers}, Signature={signature}"
-        ),
-    }
+    return wrapper
 
-    response = requests.post(
-        f"https://{HOST}/",
-        headers=headers,
-        params=query,
-        data=body_str,   # ✅ JSON BODY
-        timeout=30,
-    )
+def _fetch_pages(action: str, body_base: dict, first_page: int, last_page: int):
+    """
+    Fetch pages first_page..last_page in parallel, at most _PAGE_WORKERS
+    ahead of the caller: a new page is requested as each one is consumed.
+    Yields (page, future) in page order so callers keep the API's ordering.
+    last_page is an estimate: past it, pages are requested one at a time for
+    as long as the caller keeps consuming (it stops on an empty page or once
+    it has TotalCount items).
+    """
+    with ThreadPoolExecutor(max_workers=_PAGE_WORKERS) as pool:
+        window = deque()
+        next_page = first_page
 
-    if response.status_code != 200:
-        print("HTTP", response.status_code)
-        print(response.text)
-        raise RuntimeError("BytePlus API error")
+        def submit():
+            nonlocal next_page
+            body = {**body_base, "PageNumber": next_page}
+            window.append((next_page, pool.submit(call_api, action, body)))
+            next_page += 1
 
-    return response.json()
+        submit()
+        while next_page <= last_page and len(window) < _PAGE_WORKERS:
+            submit()
 
-def list_all_collections():
-    page = 1
+        try:
+            while window:
+                yield window.popleft()
+                if next_page <= last_page or not window:
+                    submit()
+        finally:
+            for _, fut in window:  # caller stopped early: drop queued pages
+                fut.cancel()
+
+def _drain(gen) -> tuple[list, bool]:
+    """
+    list(gen) plus the generator's return value (True = listing complete).
+    """
+    items = []
+    while True:
+        try:
+            items.append(next(gen))
+        except StopIteration as stop:
+            return items, bool(stop.value)
+
+def iter_all_collections():
+    """
+    Yield collections one at a time, paginating internally.
+    Returns True once the listing is complete.
+    """
     page_size = 100
-    collections = []
+    body_base = {
+        "ProjectName": "AIAnimation",  # change if needed
+        "PageSize": page_size,
+    }
 
-    while True:
-        data = call_api(
-            "ListVikingdbCollection",
-            {
-                "ProjectName": "AIAnimation",  # change if needed
-                "PageNumber": page,
-                "PageSize": page_size,
-            },
-        )
+    data = call_api("ListVikingdbCollection", {**body_base, "PageNumber": 1})
+    result = data.get("Result", {})
+    items = result.get("Collections", [])
+    total = result.get("TotalCount", 0)
 
-        result = data.get("Result", {})
-        items = result.get("Collections", [])
-        total = result.get("TotalCount", 0)
+    yield from items
 
-        collections.extend(items)
+    fetched = len(items)
+    if not items or fetched >= total:
+        return True
 
-        if not items or len(collections) >= total:
-            break
+    # page 1's length, not PageSize: the server may cap the page size
+    num_pages = math.ceil(total / len(items))
+    for _, fut in _fetch_pages("ListVikingdbCollection", body_base, 2, num_pages):
+        items = fut.result().get("Result", {}).get("Collections", [])
+        yield from items
 
-        page += 1
+        fetched += len(items)
+        if not items or fetched >= total:
+            return True
 
-    return collections
+@_disk_cached
+def list_all_collections():
+    return _drain(iter_all_collections())
 
-def list_all_indexes(
+def iter_all_indexes(
     project_name: str = "AIAnimation",
     collection_names: list[str] | None = None,   # e.g. ["ImageCollection", "dataset"]
     status_filter: list[str] | None = None,      # e.g. ["READY"]
@@ -150,12 +180,9 @@ def list_all_indexes(
     page_size: int = 50
 ):
     """
-    List all indexes in VikingDB (paginated), with optional filters.
-    Returns a list of index details.
+    Yield all indexes in VikingDB (paginated), with optional filters.
+    Stops at the first page that fails; returns True only if no page failed.
     """
-    indexes = []
-    page = 1
-
     filter_body = {}
     if collection_names:
         filter_body["CollectionName"] = collection_names
@@ -180,29 +207,56 @@ def list_all_indexes(
         print(f"  Name keyword: '{index_name_keyword}'")
     print(f"  Project: {project_name}\n")
 
-    while True:
-        body = {**body_base, "PageNumber": page}
+    try:
+        data = call_api("ListVikingdbIndex", {**body_base, "PageNumber": 1})
+    except RuntimeError as e:
+        print(f"API error on page 1: {e}")
+        return False
+
+    result = data.get("Result", {})
+    page_indexes = result.get("Indexes", [])
+    total = result.get("TotalCount", 0)
+    fetched = len(page_indexes)
+
+    print(f"Page 1: fetched {len(page_indexes)} indexes (total so far: {fetched} / {total})")
+    yield from page_indexes
+
+    if not page_indexes or fetched >= total:
+        return True
 
+    # page 1's length, not page_size: the server may cap the page size
+    num_pages = math.ceil(total / len(page_indexes))
+    for page, fut in _fetch_pages("ListVikingdbIndex", body_base, 2, num_pages):
         try:
-            data = call_api("ListVikingdbIndex", body)
+            data = fut.result()
         except RuntimeError as e:
             print(f"API error on page {page}: {e}")
-            break
+            return False
 
-        result = data.get("Result", {})
-        page_indexes = result.get("Indexes", [])
-        total = result.get("TotalCount", 0)
+        page_indexes = data.get("Result", {}).get("Indexes", [])
+        fetched += len(page_indexes)
 
-        indexes.extend(page_indexes)
+        print(f"Page {page}: fetched {len(page_indexes)} indexes (total so far: {fetched} / {total})")
+        yield from page_indexes
 
-        print(f"Page {page}: fetched {len(page_indexes)} indexes (total so far: {len(indexes)} / {total})")
+        if not page_indexes or fetched >= total:
+            return True
 
-        if not page_indexes or len(indexes) >= total:
-            break
-
-        page += 1
-
-    return indexes
+@_disk_cached
+def list_all_indexes(
+    project_name: str = "AIAnimation",
+    collection_names: list[str] | None = None,
+    status_filter: list[str] | None = None,
+    index_name_keyword: str | None = None,
+    page_size: int = 50
+):
+    """
+    List all indexes in VikingDB (paginated), with optional filters.
+    Returns a list of index details.
+    """
+    return _drain(iter_all_indexes(
+        project_name, collection_names, status_filter, index_name_keyword, page_size
+    ))
 
 def get_collection_details(
     collection_name: str = None,
@@ -238,108 +292,130 @@ def get_collection_details(
         print(f"API call failed: {e}")
         return None
 
-    print("\nCollection Details (full response):")
-    print(json.dumps(result, indent=2))
+    out = ["\nCollection Details (full response):", _pretty(result)]
 
     # Pretty-print key sections for easier reading
     res = result.get("Result", {})
     if not res:
-        print("No 'Result' in response – check for errors above.")
+        out.append("No 'Result' in response – check for errors above.")
+        sys.stdout.write("\n".join(out) + "\n")
         return result
 
-    print("\nSummary:")
-    print(f"  ProjectName:     {res.get('ProjectName')}")
-    print(f"  ResourceId:      {res.get('ResourceId')}")
-    print(f"  CollectionName:  {res.get('CollectionName')}")
-    print(f"  Description:     {res.get('Description', '(empty)')}")
-    print(f"  CreateTime:      {res.get('CreateTime')}")
-    print(f"  UpdateTime:      {res.get('UpdateTime')}")
-    print(f"  UpdatePerson:    {res.get('UpdatePerson')}")
-    print(f"  EnableKeywordsSearch: {res.get('EnableKeywordsSearch')}")
-
-    print("\nFields:")
+    out.append("\nSummary:")
+    out.append(f"  ProjectName:     {res.get('ProjectName')}")
+    out.append(f"  ResourceId:      {res.get('ResourceId')}")
+    out.append(f"  CollectionName:  {res.get('CollectionName')}")
+    out.append(f"  Description:     {res.get('Description', '(empty)')}")
+    out.append(f"  CreateTime:      {res.get('CreateTime')}")
+    out.append(f"  UpdateTime:      {res.get('UpdateTime')}")
+    out.append(f"  UpdatePerson:    {res.get('UpdatePerson')}")
+    out.append(f"  EnableKeywordsSearch: {res.get('EnableKeywordsSearch')}")
+
+    out.append("\nFields:")
     fields = res.get("Fields", [])
     if fields:
         for field in fields:
-            print(f"  - {field.get('FieldName')}: type={field.get('FieldType')}", end="")
-            if field.get("Dim"):
-                print(f", dim={field.get('Dim')}", end="")
+            dim = field.get("Dim")
+            default = field.get("DefaultValue")
+            parts = [f"  - {field.get('FieldName')}: type={field.get('FieldType')}"]
+            if dim:
+                parts.append(f", dim={dim}")
             if field.get("IsPrimaryKey"):
-                print(" (PRIMARY KEY)", end="")
-            if field.get("DefaultValue") is not None:
-                print(f", default={field.get('DefaultValue')}", end="")
-            print()
+                parts.append(" (PRIMARY KEY)")
+            if default is not None:
+                parts.append(f", default={default}")
+            out.append("".join(parts))
     else:
-        print("  (no fields defined)")
+        out.append("  (no fields defined)")
 
-    print("\nVectorization Config:")
+    out.append("\nVectorization Config:")
     vec = res.get("Vectorize", {})
     if vec:
         dense = vec.get("Dense", {})
         if dense:
-            print("  Dense:")
-            print(f"    Model: {dense.get('ModelName')} v{dense.get('ModelVersion')}")
-            print(f"    Field: text={dense.get('TextField')}, image={dense.get('ImageField')}")
-            print(f"    Dim:   {dense.get('Dim') or '(model default)'}")
+            out.append("  Dense:")
+            out.append(f"    Model: {dense.get('ModelName')} v{dense.get('ModelVersion')}")
+            out.append(f"    Field: text={dense.get('TextField')}, image={dense.get('ImageField')}")
+            out.append(f"    Dim:   {dense.get('Dim') or '(model default)'}")
         sparse = vec.get("Sparse", {})
         if sparse:
-            print("  Sparse:")
-            print(f"    Model: {sparse.get('ModelName')} v{sparse.get('ModelVersion')}")
-            print(f"    TextField: {sparse.get('TextField')}")
+            out.append("  Sparse:")
+            out.append(f"    Model: {sparse.get('ModelName')} v{sparse.get('ModelVersion')}")
+            out.append(f"    TextField: {sparse.get('TextField')}")
     else:
-        print("  (no vectorization / auto-embedding configured)")
+        out.append("  (no vectorization / auto-embedding configured)")
 
     stats = res.get("CollectionStats", {})
-    print("\nStats:")
-    print(f"  DataCount:    {stats.get('DataCount', 0)} entries")
-    print(f"  DataStorage:  {stats.get('DataStorage', 0)} bytes")
+    out.append("\nStats:")
+    out.append(f"  DataCount:    {stats.get('DataCount', 0)} entries")
+    out.append(f"  DataStorage:  {stats.get('DataStorage', 0)} bytes")
 
-    print("\nIndexes:")
-    print(f"  Count: {res.get('IndexCount', 0)}")
+    out.append("\nIndexes:")
+    out.append(f"  Count: {res.get('IndexCount', 0)}")
     index_names = res.get("IndexNames", [])
     if index_names:
-        print("  Names:")
+        out.append("  Names:")
         for idx in index_names:
-            print(f"    - {idx}")
+            out.append(f"    - {idx}")
     else:
-        print("  (no indexes yet)")
+        out.append("  (no indexes yet)")
 
+    # one write instead of a print() (lock + format) per line
+    sys.stdout.write("\n".join(out) + "\n")
     return result
 
-def print_indexes(indexes_list):
-    if not indexes_list:
-        print("No indexes found.")
-        return
-
-    print(f"\nFound {len(indexes_list)} indexes:\n")
-    for idx in indexes_list:
-        print(f"Index: {idx.get('IndexName')}")
-        print(f"  Collection:     {idx.get('CollectionName')}")
-        print(f"  Project:        {idx.get('ProjectName')}")
-        print(f"  ResourceId:     {idx.get('ResourceId')}")
-        print(f"  Description:    {idx.get('Description', '(empty)')}")
+def print_indexes(indexes):
+    """
+    Print index summaries; accepts a list or an iterable such as iter_all_indexes().
+    Each index is written as soon as it arrives, so printing overlaps with
+    fetching the next pages.
+    """
+    if isinstance(indexes, list):
+        if not indexes:
+            print("No indexes found.")
+            return
+        print(f"\nFound {len(indexes)} indexes:\n")
+
+    count = 0
+    for idx in indexes:
+        count += 1
+        out = [f"Index: {idx.get('IndexName')}"]
+        out.append(f"  Collection:     {idx.get('CollectionName')}")
+        out.append(f"  Project:        {idx.get('ProjectName')}")
+        out.append(f"  ResourceId:     {idx.get('ResourceId')}")
+        out.append(f"  Description:    {idx.get('Description', '(empty)')}")
 
         vec = idx.get("VectorIndex", {})
         if vec:
-            print("  VectorIndex:")
-            print(f"    Type:     {vec.get('IndexType')}")
-            print(f"    Distance: {vec.get('Distance')}")
-            print(f"    Quant:    {vec.get('Quant')}")
+            out.append("  VectorIndex:")
+            out.append(f"    Type:     {vec.get('IndexType')}")
+            out.append(f"    Distance: {vec.get('Distance')}")
+            out.append(f"    Quant:    {vec.get('Quant')}")
             if "HnswM" in vec:
-                print(f"    HnswM:    {vec.get('HnswM')}")
-                print(f"    HnswCef:  {vec.get('HnswCef')}")
-                print(f"    HnswSef:  {vec.get('HnswSef')}")
+                out.append(f"    HnswM:    {vec.get('HnswM')}")
+                out.append(f"    HnswCef:  {vec.get('HnswCef')}")
+                out.append(f"    HnswSef:  {vec.get('HnswSef')}")
 
         scalars = idx.get("ScalarIndex", [])
         if scalars:
-            print("  ScalarIndex fields:")
+            out.append("  ScalarIndex fields:")
             for s in scalars:
-                print(f"    - {s.get('FieldName')} ({s.get('FieldType')})")
+                out.append(f"    - {s.get('FieldName')} ({s.get('FieldType')})")
+
+        out.append(f"  ShardPolicy:    {idx.get('ShardPolicy')}")
+        out.append(f"  ShardCount:     {idx.get('ShardCount')}")
+        out.append(f"  CpuQuota:       {idx.get('CpuQuota')}")
+        out.append(_SEP)
+
+        # one write per index instead of a print() (lock + format) per line
+        sys.stdout.write("\n".join(out) + "\n")
 
-        print(f"  ShardPolicy:    {idx.get('ShardPolicy')}")
-        print(f"  ShardCount:     {idx.get('ShardCount')}")
-        print(f"  CpuQuota:       {idx.get('CpuQuota')}")
-        print("-" * 60)
+    if isinstance(indexes, list):
+        return
+    if not count:
+        print("No indexes found.")
+    else:
+        print(f"\nFound {count} indexes.")
 
 def get_index_details(
     index_name: str,
@@ -383,7 +459,7 @@ def get_index_details(
         return None
 
     print("\nIndex Details (full response):")
-    print(json.dumps(result, indent=2))
+    print(_pretty(result))
 
     # Pretty-print key sections for readability
     res = result.get("Result", {})
@@ -450,8 +526,7 @@ if __name__ == "__main__":
     #     )
         
     get_collection_details(resource_id="vdb-acbe6daef04b42b6881f30dcada2ddde")
-    # all_indexes = list_all_indexes()
-    # print_indexes(all_indexes)
+    # print_indexes(iter_all_indexes())
     get_index_details(
         index_name="idx_hnsw_1",           # ← change to your actual index name
         collection_name="ImageCollection"          # or "ImageCollection"
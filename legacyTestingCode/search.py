@@ -4,20 +4,38 @@ BytePlus VikingDB Management + Search Script (Johor region)
 - Control Plane: create/update/list collections & indexes
 - Data Plane: vector search test
 
-Run with: python this_script.py
+Run with: python this_script.py [--verbose] [--debug]
 """
 
+import argparse
+import asyncio
 import json
-import hashlib
-import hmac
-import datetime
+import functools
+import logging
 import os
-from urllib.parse import quote
+import ssl
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import httpx  # pip install "httpx[http2]"
+import orjson  # pip install orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 
 from dotenv import load_dotenv
 
+# Signing helpers; resolves to the mypyc-compiled build when present
+from sigv4 import (
+    AsyncClientPerLoop,
+    SigningKeys,
+    authorization,
+    norm_query,
+    sha256_hex,
+    utc_x_date,
+)
+
 load_dotenv()
 
 # ────────────────────────────────────────────────
@@ -40,40 +58,214 @@ SERVICE = "vikingdb"
 VERSION = "2025-06-09"
 
 
+@dataclass(frozen=True, slots=True, eq=False)
+class VDBConfig:
+    """
+    Credentials and endpoints, resolved once at import so each call just
+    reads attributes. eq=False keeps identity hashing, so the Id Search
+    cache keys on the config object in O(1). k_signing comes from
+    signing_keys (the process-wide sigv4 cache); it is left out of the repr
+    so tracebacks / logs that show a cfg never touch the credential.
+    """
+    ak: str
+    signing_keys: SigningKeys = field(repr=False)
+    cp_host: str
+    dp_host: str
+    region: str
+    service: str
+    version: str
+
+
+CONFIG = VDBConfig(
+    ak=BYTEPLUS_VIKINGDB_AK,
+    signing_keys=SigningKeys(BYTEPLUS_VIKINGDB_SK, REGION, SERVICE),
+    cp_host=CP_HOST,
+    dp_host=DP_HOST,
+    region=REGION,
+    service=SERVICE,
+    version=VERSION,
+)
+
+# ────────────────────────────────────────────────
+# HTTP Session (keep-alive + connection pooling)
+# ────────────────────────────────────────────────
+# One pooled session for the whole process so repeated calls reuse the
+# same TCP/TLS connection instead of handshaking with Johor every time.
+#
+# TLS 1.2 suites are limited to ECDHE with AES-GCM first (AES-NI/PCLMULQDQ
+# accelerated), ChaCha20 as fallback; TLS 1.3 already prefers AES-GCM.
+# OP_NO_TICKET is left unset so session tickets / resumption stay on.
+_SSL_CTX = ssl.create_default_context()
+_SSL_CTX.set_ciphers("ECDHE+AESGCM:ECDHE+CHACHA20")
+
+
+class _TLSAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _SSL_CTX
+        return super().init_poolmanager(*args, **kwargs)
+
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", _TLSAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],   # every VikingDB call is a POST
+    ),
+))
+_SESSION.headers.update({"Accept-Encoding": "gzip"})
+
+
 # ────────────────────────────────────────────────
 # Shared Helpers
 # ────────────────────────────────────────────────
-def sha256_hex(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+@functools.lru_cache(maxsize=8)
+def _canonical_template(host: str, path: str, action: str, version: str):
+    """
+    Parts of the canonical request that only depend on the endpoint.
+    Returns (query_str, header_prefix).
+    """
+    query_str = norm_query({"Action": action, "Version": version})
+    header_prefix = f"content-type:application/json\nhost:{host}\n"
+    return query_str, header_prefix
 
 
-def hmac_sha256(key: bytes, msg: str) -> bytes:
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+# ────────────────────────────────────────────────
+# Local Response Cache (idempotent actions only)
+# ────────────────────────────────────────────────
+# Read-only control-plane actions are answered from RAM for a short while
+# so repeated menu choices don't round-trip to Johor.
+CACHEABLE_ACTION_PREFIXES = ("List", "Get", "Describe")
+RESPONSE_CACHE_MAXSIZE = 64
+RESPONSE_CACHE_TTL = 60  # seconds
 
+# (action, host, path, body_hash) -> (expires_at, response)
+_RESPONSE_CACHE: OrderedDict = OrderedDict()
 
-def norm_query(params: dict) -> str:
-    return "&".join(
-        f"{quote(str(k), safe='-_.~')}={quote(str(v), safe='-_.~')}"
-        for k, v in sorted(params.items())
-    )
+# collection name -> index names, filled from ListVikingdbIndex
+_INDEX_CACHE: dict[str, list[str]] = {}
+
+
+def _cache_get(key):
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _RESPONSE_CACHE[key]
+        return None
+    _RESPONSE_CACHE.move_to_end(key)
+    return value
+
+
+def _cache_put(key, value):
+    _RESPONSE_CACHE[key] = (time.monotonic() + RESPONSE_CACHE_TTL, value)
+    _RESPONSE_CACHE.move_to_end(key)
+    while len(_RESPONSE_CACHE) > RESPONSE_CACHE_MAXSIZE:
+        _RESPONSE_CACHE.popitem(last=False)
+
+
+# ────────────────────────────────────────────────
+# Result Printing
+# ────────────────────────────────────────────────
+log = logging.getLogger(__name__)
+
+# Full per-row dumps are opt-in (--verbose); summaries are always printed
+VERBOSE = False
+
+
+def _log_response(result: dict) -> None:
+    # Only pay for pretty-printing the whole response when DEBUG is on
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s", orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
+
+
+def _hit_line(d: dict, fields: tuple[str, ...] | None) -> str:
+    line = f"  • {d.get('id')}"
+    if d.get("score") is not None:  # Id / random / scalar hits carry no score
+        line += f" score={d['score']:.4f}"
+    row = d.get("fields") or {}
+    for k in (row if fields is None else fields):
+        if k in row:
+            line += f" {k}={row[k]}"
+    return line
+
+
+def print_hits(data: list, fields: tuple[str, ...] | None = ()) -> None:
+    """
+    One summary line per hit: id, score (if the hit has one) and the given
+    row fields (None = all of them); with VERBOSE, every row follows in a
+    single indented JSON write (instead of formatting each row field-by-field).
+    """
+    if not data:
+        return
+    print("\n".join(_hit_line(d, fields) for d in data))
+    if not VERBOSE:
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n")
+    sys.stdout.buffer.flush()
 
 
 # ────────────────────────────────────────────────
 # Generic API Caller (used by both Control & Data Plane)
 # ────────────────────────────────────────────────
+def _cache_key_for(action: str, host: str, path: str, body_hash: str):
+    if action.startswith(CACHEABLE_ACTION_PREFIXES):
+        return (action, host, path, body_hash)
+    return None
+
+
+def _signed_headers(
+    cfg: VDBConfig, action: str, host: str, path: str, version: str, body_hash: str
+) -> dict:
+    x_date = utc_x_date()
+
+    query_str, header_prefix = _canonical_template(host, path, action, version)
+
+    return {
+        "Content-Type": "application/json",
+        "Host": host,
+        "X-Date": x_date,
+        "X-Content-Sha256": body_hash,
+        "Authorization": authorization(
+            cfg.ak,
+            cfg.signing_keys.for_date(x_date[:8]),
+            path,
+            query_str,
+            header_prefix,
+            body_hash,
+            x_date,
+            cfg.region,
+            cfg.service,
+        ),
+    }
+
+
+def _parse_response(status_code: int, content: bytes, host: str, path: str, cache_key):
+    if status_code != 200:
+        print(f"HTTP {status_code} | {host}{path}")
+        print(content[:1024].decode("utf-8", "replace"))
+        raise RuntimeError("VikingDB API error")
+
+    result = orjson.loads(content)
+    if cache_key is not None:
+        _cache_put(cache_key, result)
+    return result
+
+
 def call_vikingdb(
     action: str,
     body: dict,
     host: str,
     path: str = "/",
-    version: str = VERSION
+    version: str | None = None,
+    cfg: VDBConfig = CONFIG
 ):
-    method = "POST"
-
-    now = datetime.datetime.now(datetime.timezone.utc)
-    x_date = now.strftime("%Y%m%dT%H%M%SZ")
-    short_date = x_date[:8]
-
+    version = version or cfg.version
     query = {
         "Action": action,
         "Version": version,
@@ -82,74 +274,213 @@ def call_vikingdb(
     body_str = json.dumps(body, separators=(",", ":"))
     body_hash = sha256_hex(body_str)
 
-    canonical_headers = (
-        f"content-type:application/json\n"
-        f"host:{host}\n"
-        f"x-content-sha256:{body_hash}\n"
-        f"x-date:{x_date}\n"
+    cache_key = _cache_key_for(action, host, path, body_hash)
+    if cache_key is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    headers = _signed_headers(cfg, action, host, path, version, body_hash)
+
+    url = f"https://{host}{path}"
+    response = _SESSION.post(
+        url,
+        headers=headers,
+        params=query,
+        data=body_str,
+        timeout=30,
     )
+    return _parse_response(response.status_code, response.content, host, path, cache_key)
 
-    signed_headers = "content-type;host;x-content-sha256;x-date"
 
-    canonical_request = "\n".join([
-        method,
-        path,
-        norm_query(query),
-        canonical_headers,
-        signed_headers,
-        body_hash,
-    ])
+# ────────────────────────────────────────────────
+# Async API Caller (HTTP/2, for concurrent batches)
+# ────────────────────────────────────────────────
+# One multiplexed HTTP/2 client per event loop; the interactive menu keeps
+# using the synchronous call_vikingdb above.
+_ASYNC_CLIENTS = AsyncClientPerLoop(
+    http2=True,
+    limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+    timeout=30,
+    verify=_SSL_CTX,
+)
 
-    credential_scope = f"{short_date}/{REGION}/{SERVICE}/request"
-    string_to_sign = "\n".join([
-        "HMAC-SHA256",
-        x_date,
-        credential_scope,
-        sha256_hex(canonical_request),
-    ])
 
-    k_date = hmac_sha256(BYTEPLUS_VIKINGDB_SK.encode(), short_date)
-    k_region = hmac_sha256(k_date, REGION)
-    k_service = hmac_sha256(k_region, SERVICE)
-    k_signing = hmac_sha256(k_service, "request")
-    signature = hmac_sha256(k_signing, string_to_sign).hex()
+def _async_client() -> httpx.AsyncClient:
+    return _ASYNC_CLIENTS.get()
 
-    headers = {
-        "Content-Type": "application/json",
-        "Host": host,
-        "X-Date": x_date,
-        "X-Content-Sha256": body_hash,
-        "Authorization": (
-            f"HMAC-SHA256 Credential={BYTEPLUS_VIKINGDB_AK}/{credential_scope}, "
-            f"SignedHeaders={signed_headers}, Signature={signature}"
-        ),
+
+async def close_async_client():
+    await _ASYNC_CLIENTS.aclose()
+
+
+async def call_vikingdb_async(
+    action: str,
+    body: dict,
+    host: str,
+    path: str = "/",
+    version: str | None = None,
+    cfg: VDBConfig = CONFIG
+):
+    version = version or cfg.version
+    query = {
+        "Action": action,
+        "Version": version,
     }
 
+    body_str = json.dumps(body, separators=(",", ":"))
+    body_hash = sha256_hex(body_str)
+
+    cache_key = _cache_key_for(action, host, path, body_hash)
+    if cache_key is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    headers = _signed_headers(cfg, action, host, path, version, body_hash)
+
     url = f"https://{host}{path}"
-    response = requests.post(
+    response = await _async_client().post(
         url,
         headers=headers,
         params=query,
-        data=body_str,
-        timeout=30,
+        content=body_str.encode("utf-8"),
     )
+    return _parse_response(response.status_code, response.content, host, path, cache_key)
+
+
+def _index_names(list_index_resp: dict) -> list[str]:
+    return [
+        idx.get("IndexName")
+        for idx in list_index_resp.get("Result", {}).get("Indexes", [])
+        if idx.get("IndexName")
+    ]
+
+
+def list_index_names(
+    collection_name: str,
+    project_name: str = "AIAnimation",
+    cfg: VDBConfig = CONFIG
+) -> list[str]:
+    """
+    Index names of a collection, fetched once per process via ListVikingdbIndex.
+    Returns [] if the lookup fails, API or network error alike (nothing is
+    cached in that case).
+    """
+    if collection_name not in _INDEX_CACHE:
+        try:
+            resp = call_vikingdb("ListVikingdbIndex", {
+                "ProjectName": project_name,
+                "CollectionName": collection_name,
+                "PageNumber": 1,
+                "PageSize": 10
+            }, cfg.cp_host, cfg=cfg)
+        except (RuntimeError, requests.RequestException):
+            # includes RetryError once the adapter gives up on 429/5xx
+            return []
+        _INDEX_CACHE[collection_name] = _index_names(resp)
+    return _INDEX_CACHE[collection_name]
+
+
+def default_index_name(collection_name: str, preferred: str = "idx_hnsw_1") -> str:
+    names = list_index_names(collection_name)
+    if preferred in names or not names:
+        return preferred
+    return names[0]
+
+@functools.lru_cache(maxsize=256)
+def _fetch_ids(
+    collection_name: str,
+    index_name: str,
+    ids: tuple[str, ...],
+    output_fields: tuple[str, ...],
+    cfg: VDBConfig = CONFIG
+):
+    """
+    Primary-key lookups are deterministic, so repeat lookups of the same IDs
+    are served from this per-process cache instead of re-signing and
+    round-tripping. Failed calls raise and are not cached.
+    """
+    # Body: use "id" as key with list (common pattern)
+    body = {
+        "collection_name": collection_name,
+        "index_name": index_name,
+        "id": list(ids),  # ← This is the key the API expects (not "ids")
+        # Optional: return specific fields
+        "output_fields": list(output_fields)
+    }
+    return call_vikingdb(
+        action="",
+        body=body,
+        host=cfg.dp_host,
+        path="/api/vikingdb/data/search/id",   # Confirmed from your pattern
+        version=cfg.version,
+        cfg=cfg
+    )
+
+
+async def id_search_batches(
+    collection_name: str,
+    index_name: str,
+    id_batches: list[list[str]],
+    output_fields: list[str] | None = None,
+    cfg: VDBConfig = CONFIG
+):
+    """
+    One Id Search per batch, all in flight at once over the shared HTTP/2 client.
+    Returns the responses in the same order as id_batches.
+    """
+    return await asyncio.gather(*[
+        call_vikingdb_async(
+            action="",
+            body={
+                "collection_name": collection_name,
+                "index_name": index_name,
+                "id": batch,
+                "output_fields": output_fields or ["id", "image", "created_at"]
+            },
+            host=cfg.dp_host,
+            path="/api/vikingdb/data/search/id",
+            version=cfg.version,
+            cfg=cfg
+        )
+        for batch in id_batches
+    ])
 
-    if response.status_code != 200:
-        print(f"HTTP {response.status_code} | {host}{path}")
-        print(response.text)
-        raise RuntimeError("VikingDB API error")
 
-    return response.json()
 def test_id_search(
     collection_name: str = "ImageCollection",
     index_name: str = "idx_hnsw_1",    # Use your real index (e.g. idx_hnsw_1 or testing_only)
-    ids_input: str = None
+    ids_input: str = None,
+    id_batches: list[list[str]] | None = None,
+    cfg: VDBConfig = CONFIG
 ):
     """
     Test Id Search – exact lookup by primary key (SHA1 IDs).
+    Pass id_batches to look up several ID lists concurrently (returns a list of responses).
     """
     print(f"\n[Data Plane] Id Search → {collection_name} (index: {index_name})")
 
+    if id_batches:
+        async def run_batches():
+            try:
+                return await id_search_batches(collection_name, index_name, id_batches, cfg=cfg)
+            finally:
+                await close_async_client()
+
+        print(f"\nSending {len(id_batches)} Id Search requests concurrently...")
+        try:
+            results = asyncio.run(run_batches())
+        except Exception as e:
+            print(f"Id search failed: {e}")
+            return None
+
+        for batch, result in zip(id_batches, results):
+            data = result.get("result", {}).get("data", [])
+            print(f"\nIDs {batch}: found {len(data)} documents")
+            print_hits(data, fields=None)
+        return results
+
     if not ids_input:
         print("\nExample IDs from previous multimodal search (copy-paste):")
         print("  2e717e2360f7ee23316966a8e482938a044329c6")
@@ -162,41 +493,26 @@ def test_id_search(
     # Split and clean IDs
     ids_list = [id.strip() for id in ids_input.split(",") if id.strip()]
 
-    # Body: use "id" as key with list (common pattern)
-    body = {
-        "collection_name": collection_name,
-        "index_name": index_name,
-        "id": ids_list,  # ← This is the key the API expects (not "ids")
-        # Optional: return specific fields
-        "output_fields": ["id", "image", "created_at"]
-    }
-
     print("\nSending Id Search request...")
     print(f"  IDs: {ids_list}")
 
     try:
-        result = call_vikingdb(
-            action="", 
-            body=body,
-            host=DP_HOST,
-            path="/api/vikingdb/data/search/id",   # Confirmed from your pattern
-            version=VERSION
+        # Sorted so the same set of IDs in any order hits the same cache entry
+        result = _fetch_ids(
+            collection_name,
+            index_name,
+            tuple(sorted(ids_list)),
+            ("id", "image", "created_at"),
+            cfg,
         )
 
         print("\nId Search SUCCESS!")
-        print(json.dumps(result, indent=2))
+        _log_response(result)
 
         # Parse results
         data = result.get("result", {}).get("data", [])
         print(f"\nFound {len(data)} documents:")
-        for item in data:
-            print(f"  • ID: {item.get('id')}")
-            fields = item.get("fields", {})
-            if fields:
-                print("    Fields:")
-                for k, v in fields.items():
-                    print(f"      {k}: {v}")
-            print("-" * 60)
+        print_hits(data, fields=None)
 
         return result
 
@@ -212,7 +528,8 @@ def test_id_search(
 def test_multimodal_search(
     collection_name: str = "ImageCollection",
     index_name: str = "idx_hnsw_1",    # ← Use your real index name!
-    top_k: int = 5
+    top_k: int = 5,
+    cfg: VDBConfig = CONFIG
 ):
     """
     Multimodal Search – official endpoint for your auto-vectorized image collection.
@@ -255,25 +572,19 @@ def test_multimodal_search(
         result = call_vikingdb(
             action="",                      # No Action needed
             body=body,
-            host=DP_HOST,
+            host=cfg.dp_host,
             path="/api/vikingdb/data/search/multi_modal",   # ← This is it!
-            version=VERSION
+            version=cfg.version,
+            cfg=cfg
         )
 
         print("\nMultimodal Search SUCCESS!")
-        print(json.dumps(result, indent=2))
+        _log_response(result)
 
         # Parse results
         data = result.get("result", {}).get("data", [])
         print(f"\nFound {len(data)} similar items:")
-        for item in data:
-            print(f"  • ID: {item.get('id')}")
-            print(f"    Score: {item.get('score'):.4f}")
-            print(f"    ANN Score: {item.get('ann_score'):.4f}")
-            fields = item.get("fields", {})
-            if "image" in fields:
-                print(f"    Image: {fields['image']}")
-            print("-" * 60)
+        print_hits(data, fields=("image",))
 
         if "real_text_query" in result.get("result", {}):
             print(f"\nReal text query used: {result['result']['real_text_query']}")
@@ -287,12 +598,18 @@ def test_multimodal_search(
 # ────────────────────────────────────────────────
 # Data Plane – Vector Search
 # ────────────────────────────────────────────────
+# Dummy query vector (all values 0.123) – length = 2048, built once at import
+DUMMY_DIM = 2048
+_DUMMY_VECTOR = [0.123] * DUMMY_DIM
+
+
 def test_vector_search(
     collection_name: str = "ImageCollection",
     index_name: str = "idx_hnsw_1",    # ← CHANGE if your index name is different!
     top_k: int = 5,
     metric: str = "cosine",            # cosine | ip | l2 – match your index config
-    output_fields: list[str] | None = None
+    output_fields: list[str] | None = None,
+    cfg: VDBConfig = CONFIG
 ):
     """
     Perform vector similarity search using official data-plane endpoint.
@@ -300,9 +617,7 @@ def test_vector_search(
     """
     print(f"\n[Data Plane] Vector Search → {collection_name} (index: {index_name}, top {top_k})")
 
-    # Dummy query vector (all values 0.123) – length = 2048
-    dummy_dim = 2048
-    query_vector = [0.123] * dummy_dim
+    query_vector = _DUMMY_VECTOR
     print(f"  Using dummy query vector (length {len(query_vector)})")
 
     body = {
@@ -324,25 +639,19 @@ def test_vector_search(
         result = call_vikingdb(
             action="",                      # ← No Action needed for this endpoint
             body=body,
-            host=DP_HOST,
+            host=cfg.dp_host,
             path="/api/vikingdb/data/search/vector",  # ← OFFICIAL PATH
-            version=VERSION
+            version=cfg.version,
+            cfg=cfg
         )
 
         print("\nSearch Response (Success!):")
-        print(json.dumps(result, indent=2))
+        _log_response(result)
 
         # Parse results
         data = result.get("result", {}).get("data", [])
         print(f"\nFound {len(data)} results:")
-        for item in data:
-            print(f"  • ID: {item.get('id')}")
-            print(f"    Score: {item.get('score'):.4f}")
-            print(f"    ANN Score: {item.get('ann_score'):.4f}")
-            fields = item.get("fields", {})
-            if fields:
-                print("    Fields:", json.dumps(fields, indent=2))
-            print("-" * 50)
+        print_hits(data, fields=None)
 
         return result
 
@@ -364,7 +673,8 @@ def test_random_search(
     collection_name: str = "ImageCollection",
     index_name: str = "idx_hnsw_1",    # ← Use a valid index (from your list: idx_hnsw_1 or testing_only)
     limit: int = 5,
-    output_fields: list[str] | None = None
+    output_fields: list[str] | None = None,
+    cfg: VDBConfig = CONFIG
 ):
     """
     Test Random Search – returns random records.
@@ -387,24 +697,18 @@ def test_random_search(
         result = call_vikingdb(
             action="", 
             body=body,
-            host=DP_HOST,
+            host=cfg.dp_host,
             path="/api/vikingdb/data/search/random",   # Confirmed from your doc
-            version=VERSION
+            version=cfg.version,
+            cfg=cfg
         )
 
         print("\nRandom Search SUCCESS!")
-        print(json.dumps(result, indent=2))
+        _log_response(result)
 
         data = result.get("result", {}).get("data", [])
         print(f"\nFound {len(data)} random items:")
-        for item in data:
-            print(f"  • ID: {item.get('id')}")
-            fields = item.get("fields", {})
-            if "image" in fields:
-                print(f"    Image: {fields['image']}")
-            if "created_at" in fields:
-                print(f"    Created at: {fields['created_at']}")
-            print("-" * 60)
+        print_hits(data, fields=("image", "created_at"))
 
         return result
 
@@ -421,7 +725,8 @@ def test_scalar_search(
     index_name: str = "idx_hnsw_1",    # Use a valid index name
     field: str = "created_at",         # Must be int64 or float32 with scalar index
     order: str = "desc",               # asc or desc
-    limit: int = 5
+    limit: int = 5,
+    cfg: VDBConfig = CONFIG
 ):
     """
     Test Scalar Search – sort by scalar field (e.g. created_at desc).
@@ -442,24 +747,18 @@ def test_scalar_search(
         result = call_vikingdb(
             action="", 
             body=body,
-            host=DP_HOST,
+            host=cfg.dp_host,
             path="/api/vikingdb/data/search/scalar",   # Official path from docs
-            version=VERSION
+            version=cfg.version,
+            cfg=cfg
         )
 
         print("\nScalar Search SUCCESS!")
-        print(json.dumps(result, indent=2))
+        _log_response(result)
 
         data = result.get("result", {}).get("data", [])
         print(f"\nFound {len(data)} items (sorted by {field} {order}):")
-        for item in data:
-            print(f"  • ID: {item.get('id')}")
-            fields = item.get("fields", {})
-            if field in fields:
-                print(f"    {field}: {fields[field]}")
-            if "image" in fields:
-                print(f"    Image: {fields['image']}")
-            print("-" * 60)
+        print_hits(data, fields=(field, "image"))
 
         return result
 
@@ -473,14 +772,23 @@ def test_scalar_search(
             print("2. Index name is correct")
         return None    
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VikingDB Tool (Johor)")
+    parser.add_argument("--verbose", action="store_true", help="print every result row as JSON")
+    parser.add_argument("--debug", action="store_true", help="log full API responses")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format="%(message)s")
+    VERBOSE = args.verbose
+
     print("VikingDB Tool (Johor) - Ctrl+C to exit\n")
-    # List indexes to get exact name
+    # List indexes to get exact name (cached for the rest of the session)
     indexes = call_vikingdb("ListVikingdbIndex", {
         "ProjectName": "AIAnimation",
         "CollectionName": "ImageCollection",
         "PageNumber": 1,
         "PageSize": 10
-    }, CP_HOST)
+    }, CONFIG.cp_host)
+    _INDEX_CACHE["ImageCollection"] = _index_names(indexes)
     print("Indexes in ImageCollection:")
     print(json.dumps(indexes, indent=2))
     while True:
@@ -505,22 +813,23 @@ if __name__ == "__main__":
             print("tos://bucketforvectordbdemo/data/truck/001.jpg")
             print("tos://bucketforvectordbdemo/data/car/red_sports_car.jpg")
             
-            test_multimodal_search(collection_name=coll, top_k=top_k)
+            test_multimodal_search(collection_name=coll, index_name=default_index_name(coll), top_k=top_k)
 
         elif choice == "4":  # or change to 3 if you want to replace
             print("\nTesting Id Search (exact lookup by ID)")
             coll = input("Collection name [ImageCollection]: ").strip() or "ImageCollection"
-            test_id_search(collection_name=coll)
+            test_id_search(collection_name=coll, index_name=default_index_name(coll))
             
         elif choice == "5":
             coll = input("Collection name [ImageCollection]: ").strip() or "ImageCollection"
             lim = input("How many random items [5]: ").strip()
             limit = int(lim) if lim.isdigit() else 5
-            test_random_search(collection_name=coll, limit=limit)
+            test_random_search(collection_name=coll, index_name=default_index_name(coll), limit=limit)
 
         elif choice == "6":
             coll = input("Collection name [ImageCollection]: ").strip() or "ImageCollection"
-            idx = input("Index name [idx_hnsw_1]: ").strip() or "idx_hnsw_1"
+            default_idx = default_index_name(coll)
+            idx = input(f"Index name [{default_idx}]: ").strip() or default_idx
             fld = input("Scalar field to sort by [created_at]: ").strip() or "created_at"
             ord = input("Order [desc]: ").strip().lower() or "desc"
             lim = input("Limit [5]: ").strip()
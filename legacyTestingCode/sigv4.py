@@ -0,0 +1,274 @@
+"""
+VikingDB HMAC-SHA256 (V4) request-signing helpers.
+
+The module is fully annotated (the signing helpers are pure string/bytes
+glue, SigV4Client a thin requests wrapper), so it can be AOT-compiled with
+mypyc:
+
+    pip install mypy
+    mypyc sigv4.py
+
+That leaves a compiled sigv4.*.so next to this file; `import sigv4` picks it
+up automatically and falls back to this pure-Python module when it is absent
+(e.g. no C toolchain).
+
+SigningKeys is the process-wide per-day k_signing cache: SigV4Client and
+the data-plane client (via volc_auth) both derive their keys through it.
+SigV4Client wraps the helpers into a signed POST transport for one endpoint
+and credential; the control-plane scripts (list.py, task.py, update.py) each
+hold one. AsyncClientPerLoop is the httpx.AsyncClient holder behind
+SigV4Client.call_async, also used directly by search.py.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+from typing import Any
+from urllib.parse import quote, urlencode
+
+import httpx  # pip install "httpx[http2]"
+import orjson  # pip install orjson
+import requests
+from requests.adapters import HTTPAdapter
+
+SIGNED_HEADERS = "content-type;host;x-content-sha256;x-date"
+
+_REQUEST_B = b"request"
+
+_SHA256 = hashlib.sha256
+
+# (sha256(sk), short_date, region, service) -> k_signing
+# sk is only ever present as a digest so the secret never sits in a cache key
+_SIGNING_KEYS: dict[tuple[bytes, str, str, str], bytes] = {}
+
+
+def utc_x_date() -> str:
+    """
+    Current UTC time as the "%Y%m%dT%H%M%SZ" X-Date every signer uses
+    (formatted from gmtime fields, skipping strftime's locale machinery).
+    """
+    t = time.gmtime()
+    return (
+        f"{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}Z"
+    )
+
+
+def sha256_hex(s: str) -> str:
+    return _SHA256(s.encode("utf-8")).hexdigest()
+
+
+def hmac_sha256(key: bytes, msg_bytes: bytes) -> bytes:
+    # hmac.digest() is a one-shot OpenSSL HMAC in C (no Python HMAC object)
+    return hmac.digest(key, msg_bytes, "sha256")
+
+
+def signing_key(sk_bytes: bytes, short_date: str, region_b: bytes, service_b: bytes) -> bytes:
+    """
+    k_date → k_region → k_service → k_signing, on pre-encoded constants.
+    """
+    k_date = hmac_sha256(sk_bytes, short_date.encode())
+    k_region = hmac_sha256(k_date, region_b)
+    k_service = hmac_sha256(k_region, service_b)
+    return hmac_sha256(k_service, _REQUEST_B)
+
+
+class SigningKeys:
+    """
+    Per-day k_signing for one (sk, region, service), memoized in the
+    process-wide _SIGNING_KEYS so every signer holding the same credential
+    shares it. The sk digest used as the cache key is computed once here,
+    not per request.
+    """
+
+    def __init__(self, sk: str, region: str, service: str) -> None:
+        self._sk_b = sk.encode()
+        self._sk_digest = _SHA256(self._sk_b).digest()
+        self._region = region
+        self._service = service
+        self._region_b = region.encode()
+        self._service_b = service.encode()
+
+    def for_date(self, short_date: str) -> bytes:
+        cache_key = (self._sk_digest, short_date, self._region, self._service)
+        key = _SIGNING_KEYS.get(cache_key)
+        if key is None:
+            key = signing_key(self._sk_b, short_date, self._region_b, self._service_b)
+            _SIGNING_KEYS[cache_key] = key
+        return key
+
+
+def norm_query(params: dict[str, str]) -> str:
+    return urlencode(sorted(params.items()), quote_via=quote, safe="-_.~")
+
+
+def authorization(
+    ak: str,
+    k_signing: bytes,
+    path: str,
+    query_str: str,
+    header_prefix: str,
+    body_hash: str,
+    x_date: str,
+    region: str,
+    service: str,
+) -> str:
+    """
+    Authorization header for a POST whose constant canonical parts
+    (query_str, header_prefix = "content-type:...\\nhost:...\\n") are precomputed.
+    """
+    canonical_request = (
+        f"POST\n{path}\n{query_str}\n"
+        f"{header_prefix}x-content-sha256:{body_hash}\nx-date:{x_date}\n\n"
+        f"{SIGNED_HEADERS}\n{body_hash}"
+    )
+
+    credential_scope = f"{x_date[:8]}/{region}/{service}/request"
+    string_to_sign = (
+        f"HMAC-SHA256\n{x_date}\n{credential_scope}\n{sha256_hex(canonical_request)}"
+    )
+
+    signature = hmac_sha256(k_signing, string_to_sign.encode()).hex()
+
+    return (
+        f"HMAC-SHA256 Credential={ak}/{credential_scope}, "
+        f"SignedHeaders={SIGNED_HEADERS}, Signature={signature}"
+    )
+
+
+class AsyncClientPerLoop:
+    """
+    One httpx.AsyncClient per running event loop: a client is bound to the
+    loop it was created on, so a later asyncio.run() gets a fresh one.
+    """
+
+    def __init__(self, **client_kwargs: Any) -> None:
+        self._client_kwargs = client_kwargs
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(**self._client_kwargs)
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+class SigV4Client:
+    """
+    Signed POST transport for one VikingDB endpoint.
+
+    Holds the keep-alive Session and the per-day k_signing for its
+    credential, so every call through the same client shares both.
+    call_async() sends the same signed request over an HTTP/2
+    httpx.AsyncClient (one per event loop; close it with aclose()).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        ak: str,
+        sk: str,
+        region: str,
+        service: str,
+        version: str,
+        timeout: float = 30,
+    ) -> None:
+        self.host = host
+        self.ak = ak
+        self.region = region
+        self.service = service
+        self.version = version
+        self.timeout = timeout
+
+        self._keys = SigningKeys(sk, region, service)
+        self.url = f"https://{host}/"
+        self._header_prefix = f"content-type:application/json\nhost:{host}\n"
+
+        self._query_cache: dict[str, str] = {}  # action -> canonical query
+
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+        self._aio = AsyncClientPerLoop(http2=True, timeout=timeout)
+
+    def _query(self, action: str) -> str:
+        q = self._query_cache.get(action)
+        if q is None:
+            q = norm_query({"Action": action, "Version": self.version})
+            self._query_cache[action] = q
+        return q
+
+    def params(self, action: str) -> dict[str, str]:
+        return {"Action": action, "Version": self.version}
+
+    def sign(self, action: str, body_bytes: bytes) -> dict[str, str]:
+        """
+        Signed headers for POSTing body_bytes (exactly as sent) to `action`.
+        """
+        body_hash = _SHA256(body_bytes).hexdigest()
+
+        x_date = utc_x_date()
+
+        return {
+            "Content-Type": "application/json",
+            "Host": self.host,
+            "X-Date": x_date,
+            "X-Content-Sha256": body_hash,
+            "Authorization": authorization(
+                self.ak, self._keys.for_date(x_date[:8]), "/", self._query(action),
+                self._header_prefix, body_hash, x_date, self.region, self.service,
+            ),
+        }
+
+    def call(self, action: str, body: dict[str, Any]) -> Any:
+        # orjson emits compact UTF-8 bytes directly: hash and send the same buffer
+        body_bytes = orjson.dumps(body)
+
+        response = self._session.post(
+            self.url,
+            headers=self.sign(action, body_bytes),
+            params=self.params(action),
+            data=body_bytes,
+            timeout=self.timeout,
+        )
+
+        return _parse_response(action, response.status_code, response.content)
+
+    async def call_async(self, action: str, body: dict[str, Any]) -> Any:
+        body_bytes = orjson.dumps(body)
+
+        response = await self._aio.get().post(
+            self.url,
+            headers=self.sign(action, body_bytes),
+            params=self.params(action),
+            content=body_bytes,
+        )
+
+        return _parse_response(action, response.status_code, response.content)
+
+    async def aclose(self) -> None:
+        await self._aio.aclose()
+
+
+def _parse_response(action: str, status: int, content: bytes) -> Any:
+    # the body is only decoded to text (and capped) for the error message
+    if status != 200:
+        raise RuntimeError(
+            f"HTTP {status} | {action}: {content[:1024].decode('utf-8', 'replace')}"
+        )
+
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        raise RuntimeError(
+            f"Invalid JSON from {action}: {content[:1024].decode('utf-8', 'replace')}"
+        ) from e
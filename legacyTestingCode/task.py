@@ -7,16 +7,13 @@ VikingDB Tool - List Tasks & Safe Test Delete/Update Tasks (Control Plane)
 """
 
 import json
-import hashlib
-import hmac
-import datetime
 import os
 import time
-from urllib.parse import quote
-import requests
 
 from dotenv import load_dotenv
 
+from sigv4 import SigV4Client
+
 load_dotenv()
 
 # ────────────────────────────────────────────────
@@ -33,100 +30,21 @@ REGION  = "ap-southeast-1"
 SERVICE = "vikingdb"
 VERSION = "2025-06-09"
 
+# One signed transport for the process: its keep-alive Session lets
+# polling calls reuse the same TCP+TLS connection, and k_signing is
+# derived once per UTC day.
+_CLIENT = SigV4Client(CP_HOST, AK, SK, REGION, SERVICE, VERSION)
 
-# ────────────────────────────────────────────────
-# Signing Helpers
-# ────────────────────────────────────────────────
-def sha256_hex(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
-
-def hmac_sha256(key: bytes, msg: str) -> bytes:
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
 
-def norm_query(params: dict) -> str:
-    return "&".join(
-        f"{quote(str(k), safe='-_.~')}={quote(str(v), safe='-_.~')}"
-        for k, v in sorted(params.items())
-    )
+# Shared encoder for the indent=2 dumps of requests/responses
+_pretty = json.JSONEncoder(indent=2, ensure_ascii=False).encode
 
 
 # ────────────────────────────────────────────────
 # Control Plane Caller
 # ────────────────────────────────────────────────
 def call_control_plane(action: str, body: dict):
-    method = "POST"
-    path = "/"
-
-    now = datetime.datetime.now(datetime.timezone.utc)
-    x_date = now.strftime("%Y%m%dT%H%M%SZ")
-    short_date = x_date[:8]
-
-    query = {
-        "Action": action,
-        "Version": VERSION,
-    }
-
-    body_str = json.dumps(body, separators=(",", ":"))
-    body_hash = sha256_hex(body_str)
-
-    canonical_headers = (
-        f"content-type:application/json\n"
-        f"host:{CP_HOST}\n"
-        f"x-content-sha256:{body_hash}\n"
-        f"x-date:{x_date}\n"
-    )
-
-    signed_headers = "content-type;host;x-content-sha256;x-date"
-
-    canonical_request = "\n".join([
-        method,
-        path,
-        norm_query(query),
-        canonical_headers,
-        signed_headers,
-        body_hash,
-    ])
-
-    credential_scope = f"{short_date}/{REGION}/{SERVICE}/request"
-    string_to_sign = "\n".join([
-        "HMAC-SHA256",
-        x_date,
-        credential_scope,
-        sha256_hex(canonical_request),
-    ])
-
-    k_date    = hmac_sha256(SK.encode(), short_date)
-    k_region  = hmac_sha256(k_date, REGION)
-    k_service = hmac_sha256(k_region, SERVICE)
-    k_signing = hmac_sha256(k_service, "request")
-    signature = hmac_sha256(k_signing, string_to_sign).hex()
-
-    headers = {
-        "Content-Type": "application/json",
-        "Host": CP_HOST,
-        "X-Date": x_date,
-        "X-Content-Sha256": body_hash,
-        "Authorization": (
-            f"HMAC-SHA256 Credential={AK}/{credential_scope}, "
-            f"SignedHeaders={signed_headers}, Signature={signature}"
-        ),
-    }
-
-    url = f"https://{CP_HOST}{path}"
-    response = requests.post(
-        url,
-        headers=headers,
-        params=query,
-        data=body_str,
-        timeout=30,
-    )
-
-    if response.status_code != 200:
-        print(f"HTTP {response.status_code} | {path}")
-        print(response.text)
-        raise RuntimeError("Control Plane API error")
-
-    return response.json()
+    return _CLIENT.call(action, body)
 
 
 # ────────────────────────────────────────────────
@@ -165,7 +83,7 @@ def list_vikingdb_tasks():
         resp = call_control_plane("ListVikingdbTask", body)
 
         print("\nList Tasks Success!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         result = resp.get("Result", {})
         tasks = result.get("Tasks", [])
@@ -224,7 +142,7 @@ def create_delete_nothing_task():
     }
 
     print("\nRequest preview (safe - deletes nothing):")
-    print(json.dumps(body, indent=2))
+    print(_pretty(body))
 
     confirm = input("\nType 'CREATE' to create this safe test task: ").strip().upper()
     if confirm != "CREATE":
@@ -235,7 +153,7 @@ def create_delete_nothing_task():
         resp = call_control_plane("CreateVikingdbTask", body)
 
         print("\nSafe Test Task Created!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         task_id = resp.get("Result", {}).get("TaskId")
         if task_id:
@@ -251,7 +169,7 @@ def create_delete_nothing_task():
             }
             list_resp = call_control_plane("ListVikingdbTask", list_body)
             print("\nLatest status:")
-            print(json.dumps(list_resp, indent=2))
+            print(_pretty(list_resp))
 
         else:
             print("No TaskId returned — check response above.")
@@ -283,7 +201,7 @@ def delete_vikingdb_task():
         resp = call_control_plane("DeleteVikingdbTask", body)
 
         print("\nDelete Success!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         print(f"\nTask {task_id} deleted.")
         print("Run 'List VikingDB tasks' (option 1) to confirm it's gone.")
@@ -323,7 +241,7 @@ def create_update_nothing_task():
     }
 
     print("\nRequest preview (safe - updates nothing):")
-    print(json.dumps(body, indent=2))
+    print(_pretty(body))
 
     confirm = input("\nType 'CREATE' to create this safe test task: ").strip().upper()
     if confirm != "CREATE":
@@ -334,7 +252,7 @@ def create_update_nothing_task():
         resp = call_control_plane("CreateVikingdbTask", body)
 
         print("\nSafe Test Task Created!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         task_id = resp.get("Result", {}).get("TaskId")
         if task_id:
@@ -350,7 +268,7 @@ def create_update_nothing_task():
             }
             list_resp = call_control_plane("ListVikingdbTask", list_body)
             print("\nLatest status:")
-            print(json.dumps(list_resp, indent=2))
+            print(_pretty(list_resp))
 
         else:
             print("No TaskId returned — check response above.")
@@ -377,7 +295,7 @@ def get_vikingdb_task():
         resp = call_control_plane("GetVikingdbTask", body)
 
         print("\nGet Task Success!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         result = resp.get("Result", {})
         if result:
@@ -417,7 +335,7 @@ def update_vikingdb_task():
         resp = call_control_plane("UpdateVikingdbTask", body)
 
         print("\nUpdate Success!")
-        print(json.dumps(resp, indent=2))
+        print(_pretty(resp))
 
         print(f"\nTask {task_id} should now be 'confirmed' and starting.")
         print("Check status with 'List VikingDB tasks' (option 1) in 10 seconds.")
@@ -1,5 +1,14 @@
 import asyncio
 import os
+from itertools import islice
+try:
+    from itertools import batched  # Python 3.12+
+except ImportError:
+    def batched(iterable, n):
+        """Backport of itertools.batched: yield tuples of up to n items."""
+        it = iter(iterable)
+        while batch := tuple(islice(it, n)):
+            yield batch
 from tqdm import tqdm  # pip install tqdm
 from volcengine.viking_db import VikingDBService, FieldType
 from volcengine.viking_db.exception import VikingDBException   # ← NEW
@@ -15,15 +24,18 @@ REGION = "ap-southeast-1"
 COLLECTION_NAME = "images_1000_test"
 IMAGE_URL_PREFIX = "https://bucketforvectordbdemo.tos-ap-southeast-1.bytepluses.com/data/bird/"  # e.g. folder prefix
 
-# Generate 1000 image URLs (adapt this to your actual files)
+# Generate 1000 image URLs lazily (adapt this to your actual files)
 # Example: assuming files named img_0001.jpg to img_1000.jpg
-IMAGE_URLS = [
-    f"{IMAGE_URL_PREFIX}img_{i:04d}.jpg" for i in range(1, 1001)
-]
-# Or load from directory listing if local first:
-# IMAGE_URLS = [f"{IMAGE_URL_PREFIX}{f}" for f in os.listdir("/local/path") if f.endswith(('.jpg', '.png'))]
+IMAGE_COUNT = 1000
 
-CONCURRENCY_LIMIT = 10  # Start low; increase if no rate-limit errors
+def image_urls():
+    return (f"{IMAGE_URL_PREFIX}img_{i:04d}.jpg" for i in range(1, IMAGE_COUNT + 1))
+# Or stream from a directory listing if local first:
+# def image_urls():
+#     return (f"{IMAGE_URL_PREFIX}{f}" for f in os.listdir("/local/path") if f.endswith(('.jpg', '.png')))
+
+BATCH_SIZE = 50         # rows per upsert request
+CONCURRENCY_LIMIT = 32  # in-flight batches; lower if you hit rate limits
 
 # ────────────────────────────────────────────────
 vikingdb_service = VikingDBService(host=HOST, region=REGION, ak=AK, sk=SK)
@@ -71,43 +83,51 @@ async def create_or_get_collection():
         else:
             raise e
 
-async def upsert_one(coll, image_url, semaphore):
+async def upsert_batch(coll, image_urls, semaphore):
     async with semaphore:
-        image_id = os.path.basename(image_url).split('.')[0]  # e.g. img_0001
         data = [{
-            "image_id": image_id,
-            "image_url": image_url,
-            "filename": os.path.basename(image_url),
-        }]
+            "image_id": os.path.basename(url).split('.')[0],  # e.g. img_0001
+            "image_url": url,
+            "filename": os.path.basename(url),
+        } for url in image_urls]
+        image_ids = [row["image_id"] for row in data]
         try:
-            await coll.async_upsert_data(data, async_upsert=True)  # async=True for higher throughput
-            return True, image_id
+            await coll.async_upsert_data(data, async_upsert=True)  # one request per batch
+            return True, image_ids, None
         except Exception as e:
-            return False, image_id, str(e)
+            return False, image_ids, str(e)
 
 async def bulk_upsert():
     coll = await create_or_get_collection()
     semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
-    tasks = []
     success_count = 0
     failed = []
 
-    with tqdm(total=len(IMAGE_URLS), desc="Upserting images") as pbar:
-        for url in IMAGE_URLS:
-            task = asyncio.create_task(upsert_one(coll, url, semaphore))
-            task.add_done_callback(lambda t: pbar.update(1))
-            tasks.append(task)
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for res in results:
-            if isinstance(res, Exception):
-                failed.append(("exception", str(res)))
-            elif res[0]:
-                success_count += 1
-            else:
-                failed.append((res[1], res[2]))
-
-    print(f"\nSuccess: {success_count}/{len(IMAGE_URLS)}")
+    def record(task):
+        nonlocal success_count
+        ok, image_ids, err = task.result()
+        pbar.update(len(image_ids))
+        if ok:
+            success_count += len(image_ids)
+        else:
+            failed.extend((image_id, err) for image_id in image_ids)
+
+    # Stream batches from the generator, keeping a bounded window of tasks
+    # so memory stays flat no matter how many URLs there are.
+    pending = set()
+    with tqdm(total=IMAGE_COUNT, desc="Upserting images") as pbar:
+        for batch in batched(image_urls(), BATCH_SIZE):
+            pending.add(asyncio.create_task(upsert_batch(coll, batch, semaphore)))
+            if len(pending) >= 2 * CONCURRENCY_LIMIT:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    record(task)
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            for task in done:
+                record(task)
+
+    print(f"\nSuccess: {success_count}/{IMAGE_COUNT}")
     if failed:
         print(f"Failed: {len(failed)}")
         for fid, err in failed[:10]:  # show first 10
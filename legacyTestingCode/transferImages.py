@@ -1,25 +1,34 @@
 #!/usr/bin/env python3
+import argparse
+import asyncio
 import os
+import queue
+import random
+import sqlite3
+import threading
 import time
-import json
 import hashlib
-from typing import Iterator
+import contextlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Iterable, Iterator
 from xmlrpc import client
 
+import aiohttp  # pip install aiohttp
 import tos
+import httpx  # pip install "httpx[http2]"
+import orjson  # pip install orjson
 import requests
 
-from volcengine.auth.SignerV4 import SignerV4
-from volcengine.Credentials import Credentials
-from volcengine.base.Request import Request
+import update
+from sigv4 import SigningKeys, utc_x_date
+from volc_auth import build_request, sign_request
 
 # ----------------------------
 # Config
 # ----------------------------
 from dotenv import load_dotenv
-import uuid
 
-doc_id = str(uuid.uuid4())
 load_dotenv()
 AK = os.getenv("AK")
 SK = os.getenv("SK")
@@ -45,18 +54,93 @@ SUBFOLDERS = ["truck"]
 
 PREFIXES = [f"{BASE_PREFIX}{name}/" for name in SUBFOLDERS]
 
-# Optional: be gentle on APIs
-SLEEP_SECONDS = 0.01
+# Rows per upsert request
+BATCH_SIZE = 100
+
+# Batches uploaded concurrently; at most MAX_IN_FLIGHT are queued at once so
+# a huge prefix never turns into a huge backlog of pending futures
+MAX_WORKERS = 16
+MAX_IN_FLIGHT = MAX_WORKERS * 2
+
+# Ids of successfully upserted rows; keys already in here are skipped on
+# the next run (delete the file to force a full re-upload)
+MANIFEST_DB = "ingest.db"
+
+# TOS pages (1000 keys each) listed ahead of the uploaders
+PAGE_QUEUE_SIZE = 2
+
+# --async mode: concurrent requests over one aiohttp connector
+ASYNC_CONCURRENCY = 32
+
+# Throttled / transient upsert responses and transport errors (e.g. an
+# unreachable host) are retried with exponential backoff plus jitter; each
+# attempt is re-signed (X-Date must be fresh). This is the only retry layer:
+# at most RETRY_ATTEMPTS connection attempts per batch.
+RETRY_ATTEMPTS = 3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5   # seconds
+BACKOFF_CAP = 8.0    # seconds
+BACKOFF_JITTER = 0.25
+
+# Ceiling on upsert requests per second across all workers (each attempt,
+# retries included, takes a slot); 0 disables the limit
+MAX_RPS = 50
+
+# Index whose CpuQuota is raised for the duration of an ingest (see bulk_mode);
+# VikingDB has no "pause indexing" switch, so more CU for the HNSW build is
+# the available lever. Restored to its previous value afterwards.
+BULK_INDEX_NAME = "idx_hnsw_1"
+BULK_CPU_QUOTA = 16
+
+# Upsert body = this constant prefix + orjson.dumps(rows) + b"}"
+# DO NOT include "async" for vectorized collections
+_UPSERT_PATH = "/api/vikingdb/data/upsert"
+_UPSERT_PREFIX = b'{"collection_name":' + orjson.dumps(COLLECTION_NAME) + b',"data":'
 
 # ----------------------------
 # Helpers
 # ----------------------------
-def sha1(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+def backoff_delay(attempt: int) -> float:
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
 
-def list_bucket_keys(prefix: str) -> Iterator[str]:
+class RateLimiter:
     """
-    Lists object keys in TOS under a prefix using the official TOS SDK.
+    Thread-safe token bucket of depth one: callers are spaced at least
+    1/rps apart, and only sleep when they would otherwise arrive early.
+    """
+    def __init__(self, rps: float):
+        self.min_interval = 1.0 / rps if rps > 0 else 0.0
+        self.next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # claim the next slot; returns how long the caller must wait for it
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next - now
+            self.next = max(now, self.next) + self.min_interval
+        return delay
+
+    def wait(self):
+        if self.min_interval and (delay := self._reserve()) > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        if self.min_interval and (delay := self._reserve()) > 0:
+            await asyncio.sleep(delay)
+
+def chunks(iterable: Iterable, batch_size: int = BATCH_SIZE) -> Iterator[list]:
+    """
+    Yield lists of up to batch_size items from any iterable (lazily).
+    """
+    it = iter(iterable)
+    while chunk := list(islice(it, batch_size)):
+        yield chunk
+
+def iter_bucket_pages(prefix: str) -> Iterator[tuple[list[str], bool]]:
+    """
+    Lists object keys in TOS under a prefix using the official TOS SDK,
+    one (keys, is_last) tuple per list_objects_type2 page.
     """
     tos_client = tos.TosClientV2(AK, SK, TOS_ENDPOINT, REGION)
 
@@ -69,58 +153,188 @@ def list_bucket_keys(prefix: str) -> Iterator[str]:
             continuation_token=token
         )
 
-        for obj in (resp.contents or []):
-            key = obj.key
-            if key and not key.endswith("/"):
-                yield key
+        keys = [
+            obj.key for obj in (resp.contents or [])
+            if obj.key and not obj.key.endswith("/")
+        ]
+        is_last = not getattr(resp, "is_truncated", False)
+        yield keys, is_last
 
-        if getattr(resp, "is_truncated", False):
-            token = getattr(resp, "next_continuation_token", None)
-        else:
+        if is_last:
             break
+        token = getattr(resp, "next_continuation_token", None)
+
+def list_bucket_keys(prefix: str) -> Iterator[str]:
+    for keys, _ in iter_bucket_pages(prefix):
+        yield from keys
+
+def prefetch_bucket_pages(prefix: str, depth: int = PAGE_QUEUE_SIZE) -> Iterator[list[str]]:
+    """
+    Yield TOS key pages while a background thread already lists the next
+    `depth` pages, so listing latency hides behind whatever the consumer does.
+    A listing error is re-raised in the consumer.
+    """
+    pages = queue.Queue(maxsize=depth)
+
+    def produce():
+        try:
+            for item in iter_bucket_pages(prefix):
+                pages.put(item)
+        except Exception as e:
+            pages.put((e, True))
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    while True:
+        keys, is_last = pages.get()
+        if isinstance(keys, Exception):
+            raise keys
+        if keys:
+            yield keys
+        if is_last:
+            return
+
+def _set_index_cpu_quota(index_name: str, cpu_quota: int):
+    # bulk mode is only an optimisation: a control-plane failure is logged,
+    # never raised into the ingest (update_index handles API errors itself)
+    try:
+        update.update_index(
+            index_name=index_name, collection_name=COLLECTION_NAME, cpu_quota=cpu_quota, confirm=False
+        )
+    except requests.RequestException as e:
+        print(f"[bulk_mode] could not set {index_name} CpuQuota={cpu_quota}: {e}")
+
+@contextlib.contextmanager
+def bulk_mode(index_name: str = BULK_INDEX_NAME, cpu_quota: int = BULK_CPU_QUOTA):
+    """
+    Raise index_name's CpuQuota to cpu_quota while the block runs, then put
+    back the quota it had before. Skipped if the current quota can't be read
+    or is already at least cpu_quota. Control-plane errors are logged and
+    never abort the block or replace its exception.
+    """
+    try:
+        current = update.call_api("GetVikingdbIndex", {
+            "ProjectName": "default",
+            "CollectionName": COLLECTION_NAME,
+            "IndexName": index_name,
+        })
+        previous = current.get("Result", {}).get("CpuQuota")
+    except (RuntimeError, requests.RequestException) as e:
+        print(f"[bulk_mode] could not read {index_name}: {e}")
+        previous = None
+
+    if previous is None or previous >= cpu_quota:
+        yield
+        return
+
+    _set_index_cpu_quota(index_name, cpu_quota)
+    try:
+        yield
+    finally:
+        _set_index_cpu_quota(index_name, previous)
+
 def make_unique_string_id_from_key(key: str) -> str:
     # Deterministic, unique per object key (recommended)
     return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def make_ids_bulk(keys: list[str]) -> list[str]:
+    """
+    make_unique_string_id_from_key for a whole batch in one comprehension
+    (same SHA-1 ids; the hash constructor is bound once per batch).
+    """
+    sha1 = hashlib.sha1
+    return [sha1(key.encode()).hexdigest() for key in keys]
 class VikingDBDataPlaneClient:
     """
-    VikingDB Data Plane client using Volcengine SignerV4.
+    VikingDB Data Plane client, signed with the SignerV4 scheme (see volc_auth).
     """
     def __init__(self, ak: str, sk: str, host: str, region: str):
         self.ak = ak
         self.sk = sk
         self.host = host
         self.region = region
-        self.session = requests.Session()
-
-    def _prepare(self, method: str, path: str, body: dict):
-        r = Request()
-        r.set_shema("https")
-        r.set_method(method.upper())
-        r.set_host(self.host)
-        r.set_path(path)
-        r.set_headers({
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Host": self.host,
-        })
-        r.set_body(json.dumps(body))
+        self._keys = SigningKeys(sk, region, VIKINGDB_SERVICE)  # sk hashed once, not per batch
+        # HTTP/2: the upload workers multiplex their requests over one TLS
+        # connection instead of each holding (and handshaking) its own.
+        # No transport-level retries: connect errors and retryable statuses
+        # share the one backoff loop in upsert_batch (RETRY_ATTEMPTS).
+        self.client = httpx.Client(
+            timeout=30.0,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=64),
+            ),
+        )
+        self._aio = None  # aiohttp.ClientSession, created on first async upsert
+        self.limiter = RateLimiter(MAX_RPS)  # shared by every worker using this client
 
-        creds = Credentials(self.ak, self.sk, VIKINGDB_SERVICE, self.region)
-        SignerV4.sign(r, creds)
-        return r
+    def _prepare(self, method: str, path: str, body_bytes: bytes):
+        r = build_request(method.upper(), path, self.host)
+        r.set_body(body_bytes)  # signed and sent as-is
 
-    def upsert_one(self, data_row: dict):
-        path = "/api/vikingdb/data/upsert"
-        body = {
-            "collection_name": COLLECTION_NAME,
-            "data": [data_row],  # 1 row per request
-            # DO NOT include "async" for vectorized collections
-        }
+        # SignerV4-compatible signature; k_signing is cached per (credential, UTC day)
+        # by SigningKeys, so only the final HMAC runs per batch
+        x_date = utc_x_date()
+        signing_key = self._keys.for_date(x_date[:8])
+        return sign_request(r, self.ak, signing_key, x_date, self.region, VIKINGDB_SERVICE)
 
-        req = self._prepare("POST", path, body)
-        url = f"https://{self.host}{path}"
-        resp = self.session.post(url, headers=req.headers, data=req.body, timeout=30)
-        return resp.status_code, resp.text
+    @staticmethod
+    def _upsert_body(rows: list[dict]) -> bytes:
+        # many rows per request: one signature + round-trip per batch. The rows
+        # are serialized in one orjson call and spliced into the constant
+        # envelope, once per batch (retries reuse the bytes)
+        return _UPSERT_PREFIX + orjson.dumps(rows) + b"}"
+
+    def _upsert_request(self, body_bytes: bytes):
+        return f"https://{self.host}{_UPSERT_PATH}", self._prepare("POST", _UPSERT_PATH, body_bytes)
+
+    def upsert_batch(self, rows: list[dict]):
+        body_bytes = self._upsert_body(rows)
+        last = RETRY_ATTEMPTS - 1
+        for attempt in range(RETRY_ATTEMPTS):
+            self.limiter.wait()
+            url, req = self._upsert_request(body_bytes)  # re-signed every attempt
+            try:
+                resp = self.client.post(url, headers=req.headers, content=req.body)
+            except httpx.TransportError:
+                if attempt == last:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == last:
+                    return resp.status_code, resp.text
+            time.sleep(backoff_delay(attempt))
+
+    async def upsert_batch_async(self, rows: list[dict]):
+        if self._aio is None or self._aio.closed:
+            self._aio = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64))
+
+        body_bytes = self._upsert_body(rows)
+        last = RETRY_ATTEMPTS - 1
+        for attempt in range(RETRY_ATTEMPTS):
+            await self.limiter.wait_async()
+            # signing stays synchronous (cheap); only the round-trip is awaited
+            url, req = self._upsert_request(body_bytes)
+            try:
+                async with self._aio.post(
+                    url, headers=req.headers, data=req.body, timeout=aiohttp.ClientTimeout(total=30)
+                ) as resp:
+                    if resp.status not in RETRY_STATUSES or attempt == last:
+                        return resp.status, await resp.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == last:
+                    raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        self.client.close()
+        if self._aio is not None:
+            await self._aio.close()
+
+    def upsert_one(self, data_row: dict):
+        return self.upsert_batch([data_row])
 
 
 # ----------------------------
@@ -130,38 +344,178 @@ def make_id_int64(key: str) -> int:
     # 63-bit positive int derived from key (stable + fits int64)
     return int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:15], 16)  # 60 bits
 
+def make_rows(keys: list[str], ids: list[str]) -> list[dict]:
+    created_at = int(time.time())
+    return [
+        {
+            "id": doc_id,
+            "image": f"tos://{BUCKET}/{key}",
+            "created_at": created_at,
+        }
+        for key, doc_id in zip(keys, ids)
+    ]
+
+def open_manifest(path: str = MANIFEST_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS done(id TEXT PRIMARY KEY)")
+    conn.commit()
+    return conn
+
+def skip_done(manifest: sqlite3.Connection, keys: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Drop keys whose id is already recorded as upserted.
+    Returns (keys, ids) for the rest; the ids are hashed here once and reused
+    by make_rows and mark_done.
+    """
+    ids = make_ids_bulk(keys)
+    placeholders = ",".join("?" * len(ids))
+    done = {
+        row[0] for row in
+        manifest.execute(f"SELECT id FROM done WHERE id IN ({placeholders})", ids)
+    }
+    if not done:
+        return keys, ids
+    kept = [(key, doc_id) for key, doc_id in zip(keys, ids) if doc_id not in done]
+    return [key for key, _ in kept], [doc_id for _, doc_id in kept]
+
+def mark_done(manifest: sqlite3.Connection, ids: list[str]):
+    with manifest:  # one transaction per batch
+        manifest.executemany(
+            "INSERT OR IGNORE INTO done VALUES (?)",
+            [(doc_id,) for doc_id in ids],
+        )
+
+def report_batch(
+    manifest: sqlite3.Connection, keys: list[str], ids: list[str], status: int, text: str, total: int
+):
+    if status >= 300:
+        print(f"[ERR] {keys[0]} .. {keys[-1]} ({len(keys)} rows) -> HTTP {status}: {text}")
+    else:
+        mark_done(manifest, ids)
+        print(f"Uploaded {total} images...")
+
 def main():
     client = VikingDBDataPlaneClient(AK, SK, VIKINGDB_HOST, REGION)
+    manifest = open_manifest()
 
     total = 0
-    for prefix in PREFIXES:
-        print(f"\n== Prefix: {prefix}")
-
-        count_in_prefix = 0
-        for key in list_bucket_keys(prefix):
-            doc_id = make_unique_string_id_from_key(key)
-            row = {
-                "id": doc_id,
-                "image": f"tos://{BUCKET}/{key}",
-                "created_at": int(time.time()),
-            }
-
-            status, text = client.upsert_one(row)
-            total += 1
-            count_in_prefix += 1
-
-            if status >= 300:
-                print(f"[ERR] {key} -> HTTP {status}: {text}")
-            else:
-                if total % 10 == 0:
-                    print(f"Uploaded {total} images...")
 
-            if SLEEP_SECONDS:
-                time.sleep(SLEEP_SECONDS)
+    def record(fut, batch):
+        nonlocal total
+        keys, ids = batch
+        try:
+            status, text = fut.result()
+        except httpx.HTTPError as e:
+            status, text = 599, str(e)
+        total += len(keys)
+        report_batch(manifest, keys, ids, status, text, total)
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            for prefix in PREFIXES:
+                print(f"\n== Prefix: {prefix}")
+
+                count_in_prefix = 0
+                skipped = 0
+                pending = {}  # future -> (keys, ids) of that batch
+                try:
+                    for batch in (batch for page in prefetch_bucket_pages(prefix) for batch in chunks(page)):
+                        keys, ids = skip_done(manifest, batch)
+                        skipped += len(batch) - len(keys)
+                        if not keys:
+                            continue
+
+                        pending[pool.submit(client.upsert_batch, make_rows(keys, ids))] = keys, ids
+                        count_in_prefix += len(keys)
+
+                        if len(pending) >= MAX_IN_FLIGHT:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for fut in done:
+                                record(fut, pending.pop(fut))
+                finally:
+                    # a TOS listing error still lets submitted batches reach the manifest
+                    for fut in wait(pending).done:
+                        record(fut, pending[fut])
+
+                print(f"Finished {prefix} ({count_in_prefix} objects, {skipped} already uploaded)")
+    finally:
+        client.close()
+        manifest.close()
+
+    print(f"\nDone. Total uploaded: {total}")
+
+async def main_async():
+    client = VikingDBDataPlaneClient(AK, SK, VIKINGDB_HOST, REGION)
+    manifest = open_manifest()
+    semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+    total = 0
+
+    async def upload(keys, ids):
+        async with semaphore:
+            try:
+                status, text = await client.upsert_batch_async(make_rows(keys, ids))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, text = 599, str(e) or type(e).__name__
+        return keys, ids, status, text
+
+    def record(task):
+        nonlocal total
+        keys, ids, status, text = task.result()
+        total += len(keys)
+        report_batch(manifest, keys, ids, status, text, total)
+
+    try:
+        for prefix in PREFIXES:
+            print(f"\n== Prefix: {prefix}")
 
-        print(f"Finished {prefix} ({count_in_prefix} objects)")
+            count_in_prefix = 0
+            skipped = 0
+            pending = set()
+            # the TOS SDK is sync: pages are prefetched on a thread and handed
+            # over via to_thread, so listing never blocks the event loop
+            pages = prefetch_bucket_pages(prefix)
+            try:
+                while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                    for batch in chunks(page):
+                        keys, ids = skip_done(manifest, batch)
+                        skipped += len(batch) - len(keys)
+                        if not keys:
+                            continue
+
+                        pending.add(asyncio.create_task(upload(keys, ids)))
+                        count_in_prefix += len(keys)
+
+                        # bound queued tasks (and their rows) to 2x the request concurrency
+                        if len(pending) >= 2 * ASYNC_CONCURRENCY:
+                            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                            for task in done:
+                                record(task)
+            finally:
+                # a TOS listing error still lets submitted batches reach the manifest
+                for task in asyncio.as_completed(pending):
+                    keys, ids, status, text = await task
+                    total += len(keys)
+                    report_batch(manifest, keys, ids, status, text, total)
+
+            print(f"Finished {prefix} ({count_in_prefix} objects, {skipped} already uploaded)")
+    finally:
+        await client.aclose()
+        manifest.close()
 
     print(f"\nDone. Total uploaded: {total}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="upload with aiohttp instead of the thread pool")
+    parser.add_argument("--no-bulk-mode", dest="bulk_mode", action="store_false",
+                        help=f"leave {BULK_INDEX_NAME}'s CpuQuota unchanged during the upload")
+    args = parser.parse_args()
+
+    with bulk_mode() if args.bulk_mode else contextlib.nullcontext():
+        if args.use_async:
+            asyncio.run(main_async())
+        else:
+            main()
@@ -1,10 +1,6 @@
 import json
-import hashlib
-import hmac
-import datetime
-import os
-from urllib.parse import quote
-import requests
+
+from sigv4 import SigV4Client
 
 
 from dotenv import load_dotenv
@@ -22,107 +18,36 @@ REGION = "ap-southeast-1"
 SERVICE = "vikingdb"
 VERSION = "2025-06-09"
 
-
-def sha256_hex(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
-
-
-def hmac_sha256(key: bytes, msg: str) -> bytes:
-    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
-
-
-def norm_query(params: dict) -> str:
-    return "&".join(
-        f"{quote(str(k), safe='-_.~')}={quote(str(v), safe='-_.~')}"
-        for k, v in sorted(params.items())
-    )
+# Signing (shared k_signing cache, see sigv4) + keep-alive Session
+_CLIENT = SigV4Client(
+    HOST, BYTEPLUS_VIKINGDB_AK or "", BYTEPLUS_VIKINGDB_SK or "", REGION, SERVICE, VERSION
+)
 
 
 def call_api(action: str, body: dict):
-    method = "POST"
-    uri = "/"
+    return _CLIENT.call(action, body)
 
-    now = datetime.datetime.now(datetime.timezone.utc)
-    x_date = now.strftime("%Y%m%dT%H%M%SZ")
-    short_date = x_date[:8]
 
-    # Action + Version go in QUERY
-    query = {
-        "Action": action,
-        "Version": VERSION,
-    }
-
-    # ✅ BODY MUST BE VALID JSON
-    body_str = json.dumps(body, separators=(",", ":"))
-    body_hash = sha256_hex(body_str)
-
-    canonical_headers = (
-        "content-type:application/json\n"
-        f"host:{HOST}\n"
-        f"x-content-sha256:{body_hash}\n"
-        f"x-date:{x_date}\n"
-    )
-
-    signed_headers = "content-type;host;x-content-sha256;x-date"
-
-    canonical_request = "\n".join([
-        method,
-        uri,
-        norm_query(query),
-        canonical_headers,
-        signed_headers,
-        body_hash,
-    ])
-
-    credential_scope = f"{short_date}/{REGION}/{SERVICE}/request"
-    string_to_sign = "\n".join([
-        "HMAC-SHA256",
-        x_date,
-        credential_scope,
-        sha256_hex(canonical_request),
-    ])
-
-    k_date = hmac_sha256(BYTEPLUS_VIKINGDB_SK.encode(), short_date)
-    k_region = hmac_sha256(k_date, REGION)
-    k_service = hmac_sha256(k_region, SERVICE)
-    k_signing = hmac_sha256(k_service, "request")
-    signature = hmac_sha256(k_signing, string_to_sign).hex()
-
-    headers = {
-        "Content-Type": "application/json",
-        "Host": HOST,
-        "X-Date": x_date,
-        "X-Content-Sha256": body_hash,
-        "Authorization": (
-            f"HMAC-SHA256 Credential={BYTEPLUS_VIKINGDB_AK}/{credential_scope}, "
-            f"SignedHeaders={signed_headers}, Signature={signature}"
-        ),
-    }
+# Async variant for scripts that fan out many updates with asyncio.gather
+# (pass confirm=False to skip the prompts); shares _CLIENT's signing
+async def call_api_async(action: str, body: dict):
+    return await _CLIENT.call_async(action, body)
 
-    response = requests.post(
-        f"https://{HOST}/",
-        headers=headers,
-        params=query,
-        data=body_str,   # ✅ JSON BODY
-        timeout=30,
-    )
 
-    if response.status_code != 200:
-        print("HTTP", response.status_code)
-        print(response.text)
-        raise RuntimeError("BytePlus API error")
-
-    return response.json()
+async def close_async_client():
+    await _CLIENT.aclose()
 
 def update_collection_description(
     collection_name: str = None,
     resource_id: str = None,
     new_description: str = None,
-    project_name: str = "default"
+    project_name: str = "default",
+    confirm: bool = True
 ):
     """
     Update ONLY the description of a VikingDB collection.
     Fetches current fields to avoid any unintended changes.
+    confirm=False skips the interactive YES prompt (for scripts).
     """
     if not collection_name and not resource_id:
         raise ValueError("You must provide either collection_name or resource_id")
@@ -162,10 +87,11 @@ def update_collection_description(
         body["ResourceId"] = resource_id
 
     # Confirmation
-    confirm = input("Type 'YES' to apply this change: ").strip().upper()
-    if confirm != "YES":
-        print("Update cancelled.")
-        return None
+    if confirm:
+        answer = input("Type 'YES' to apply this change: ").strip().upper()
+        if answer != "YES":
+            print("Update cancelled.")
+            return None
 
     # Step 3: Send the update
     try:
@@ -196,12 +122,14 @@ def update_index(
     shard_policy: str | None = None,      # "auto" or "custom"
     shard_count: int | None = None,
     scalar_index: list[str] | None = None,  # list of field names or [] for none
-    project_name: str = "default"
+    project_name: str = "default",
+    confirm: bool = True
 ):
     """
     Update a VikingDB index (e.g. description, CPU quota, sharding, scalar fields).
     Only send parameters you want to change.
     Provide EITHER collection_name OR resource_id.
+    confirm=False skips the interactive YES prompt (for scripts).
     """
     if not index_name:
         raise ValueError("index_name is required")
@@ -261,10 +189,11 @@ def update_index(
     print(f"  Collection: {collection_name or resource_id} (project: {project_name})")
     print()
 
-    confirm = input("Type 'YES' to send update request: ").strip().upper()
-    if confirm != "YES":
-        print("Update cancelled.")
-        return None
+    if confirm:
+        answer = input("Type 'YES' to send update request: ").strip().upper()
+        if answer != "YES":
+            print("Update cancelled.")
+            return None
 
     try:
         result = call_api("UpdateVikingdbIndex", body)
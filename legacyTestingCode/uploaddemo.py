@@ -1,5 +1,7 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from volc_auth import prepare_request
 import webbrowser
 import json
@@ -11,6 +13,20 @@ SK = os.getenv("SK")
 DOMAIN = "api-vikingdb.vikingdb.ap-southeast-1.bytepluses.com"
 PATH = "/api/vikingdb/data/search/multi_modal"
 
+# Reuse one pooled keep-alive session instead of a fresh connection per call
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+    ),
+))
+_SESSION.headers.update({"Accept-Encoding": "gzip"})
+
 body = {
     "collection_name": "test",
     "index_name": "testindex",
@@ -31,7 +47,7 @@ req = prepare_request(
     data=body,
 )
 
-resp = requests.request(
+resp = _SESSION.request(
     method=req.method,
     url=f"https://{DOMAIN}{req.path}",
     headers=req.headers,
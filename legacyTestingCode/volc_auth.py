@@ -1,9 +1,23 @@
-import json
-from volcengine.auth.SignerV4 import SignerV4
+import hashlib
+import hmac
+from urllib.parse import quote, urlencode
+import orjson  # pip install orjson
 from volcengine.base.Request import Request
-from volcengine.Credentials import Credentials
 
-def prepare_request(method, path, ak, sk, host, region, service, params=None, data=None):
+from sigv4 import SigningKeys, utc_x_date
+
+
+def compute_signing_key(sk, region, service, short_date):
+    # One-shot form of sigv4.SigningKeys (same process-wide cache); clients
+    # that sign repeatedly should hold a SigningKeys instead
+    return SigningKeys(sk, region, service).for_date(short_date)
+
+
+def _norm_query(params):
+    return urlencode(sorted(params.items()), quote_via=quote, safe="-_.~")
+
+
+def build_request(method, path, host, params=None, data=None):
     r = Request()
     r.set_shema("https")
     r.set_method(method)
@@ -21,10 +35,62 @@ def prepare_request(method, path, ak, sk, host, region, service, params=None, da
         r.set_query(params)
 
     if data is not None:
-        # sign the exact bytes you send
-        r.set_body(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+        # sign the exact bytes you send (orjson: compact UTF-8 bytes, no re-encode)
+        r.set_body(orjson.dumps(data))
 
-    # ✅ V2 data plane signing scope
-    credentials = Credentials(ak, sk, service, region)
-    SignerV4.sign(r, credentials)
     return r
+
+
+def sign_request(req, ak, signing_key, x_date, region, service):
+    """
+    Same V4 scheme as volcengine's SignerV4, but with a precomputed signing key
+    (see compute_signing_key) so only the final HMAC runs per request.
+    x_date must be the "%Y%m%dT%H%M%SZ" UTC timestamp the key was derived for.
+    """
+    body = req.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    body_hash = hashlib.sha256(body).hexdigest()
+
+    req.headers["X-Date"] = x_date
+    req.headers["X-Content-Sha256"] = body_hash
+
+    signed = {
+        k.lower(): v for k, v in req.headers.items()
+        if k in ("Content-Type", "Content-Md5", "Host") or k.startswith("X-")
+    }
+    signed_headers = ";".join(sorted(signed))
+    canonical_headers = "".join(f"{k}:{signed[k]}\n" for k in sorted(signed))
+
+    canonical_request = "\n".join([
+        req.method,
+        quote(req.path or "/").replace("+", "%20"),
+        _norm_query(req.query or {}),
+        canonical_headers,
+        signed_headers,
+        body_hash,
+    ])
+
+    credential_scope = f"{x_date[:8]}/{region}/{service}/request"
+    string_to_sign = "\n".join([
+        "HMAC-SHA256",
+        x_date,
+        credential_scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    signature = hmac.digest(signing_key, string_to_sign.encode("utf-8"), "sha256").hex()
+
+    req.headers["Authorization"] = (
+        f"HMAC-SHA256 Credential={ak}/{credential_scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return req
+
+
+def prepare_request(method, path, ak, sk, host, region, service, params=None, data=None):
+    r = build_request(method, path, host, params=params, data=data)
+
+    # ✅ V2 data plane signing scope
+    x_date = utc_x_date()
+    signing_key = compute_signing_key(sk, region, service, x_date[:8])
+    return sign_request(r, ak, signing_key, x_date, region, service)